@@ -0,0 +1,179 @@
+# 純Python行処理版のクレンジングLambda
+import json
+import os
+import queue
+import threading
+
+import boto3
+
+from multipart_writer import MultipartS3Writer
+from specialized_validator import build_line_validator
+
+s3_client = boto3.client('s3')
+
+# Cython拡張があればチャンク全体を1パスで処理する
+try:
+    from fast_cleanse import cleanse_chunk
+except ImportError:
+    cleanse_chunk = None
+
+# Numbaレイヤーがあればjitコンパイル済みのバイト列バリデーターを使う
+try:
+    from validator import validate_bytes
+except ImportError:
+    validate_bytes = None
+
+# コールドスタート時に一度だけスキーマ特化版を生成する
+validate_csv_row = build_line_validator(
+    name_limit=int(os.environ.get('NAME_MAX_LENGTH', '20')))
+
+
+def lambda_handler(event, context):
+    """
+    大容量CSVファイルのクレンジング処理を行うLambda関数（純Python行処理版）
+    """
+    valid_stream = None
+    error_stream = None
+    try:
+        # S3イベントから情報を取得
+        if 'Records' in event:
+            bucket = event['Records'][0]['s3']['bucket']['name']
+            key = event['Records'][0]['s3']['object']['key']
+        else:
+            bucket = event.get('bucket', os.environ.get('SOURCE_BUCKET'))
+            key = event.get('key')
+
+        dest_bucket = os.environ.get('DEST_BUCKET')
+
+        print(f"Processing file: s3://{bucket}/{key}")
+
+        # ファイルサイズを取得
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        file_size_mb = response['ContentLength'] / (1024 * 1024)
+        print(f"File size: {file_size_mb:.2f} MB")
+
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        body = obj['Body']
+
+        valid_key = f"cleansed/{key}"
+        error_key = f"error/{key}"
+
+        # 出力は溜め込まず、検証と並行してマルチパートアップロードする
+        valid_stream = MultipartS3Writer(s3_client, dest_bucket, valid_key)
+        error_stream = MultipartS3Writer(s3_client, dest_bucket, error_key)
+
+        valid_count = 0
+        error_count = 0
+
+        # デコードせずbytesのまま検証する（Numbaが無ければ純Python版）
+        validate_line = validate_bytes if validate_bytes is not None else validate_csv_row
+
+        # S3からのreadは背景スレッドに逃がし、有界キュー経由で
+        # 受け取ることでネットワーク待ちとCPU処理をオーバーラップさせる
+        chunk_queue = queue.Queue(maxsize=4)
+
+        def _prefetch():
+            try:
+                while True:
+                    data = body.read(8 << 20)
+                    if not data:
+                        break
+                    chunk_queue.put(data)
+                chunk_queue.put(None)  # 正常終端マーカー
+            except Exception as exc:
+                # 読み込み途中の失敗を終端と区別せずに握り潰すと、
+                # 途中までのデータで正常完了してしまう。例外ごと
+                # キューに流して消費側で再送出する
+                chunk_queue.put(exc)
+
+        threading.Thread(target=_prefetch, daemon=True).start()
+
+        # 8MB単位のチャンクをC実装のbytes.splitで一括分割する
+        # （iter_lines()は1行ごとにPython関数呼び出しが入るため不使用）
+        tail = b''
+        header_done = False
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                # 先読みスレッドで起きたS3読み込みエラーはここで
+                # 再送出し、except節でマルチパートを破棄させる
+                raise chunk
+            if not header_done:
+                # 1行目はヘッダーとして切り出し、両方の出力に書く
+                nl = chunk.find(b'\n')
+                if nl < 0:
+                    tail += chunk
+                    continue
+                header_line = tail + chunk[:nl]
+                valid_stream.write(header_line + b'\n')
+                error_stream.write(header_line + b'\n')
+                chunk = chunk[nl + 1:]
+                tail = b''
+                header_done = True
+            if cleanse_chunk is not None:
+                # Cython拡張: 行の切り出しから振り分けまでをC1パスで行う
+                valid_part, error_part, tail, v_cnt, e_cnt = cleanse_chunk(chunk, tail)
+                valid_stream.write(valid_part)
+                error_stream.write(error_part)
+                valid_count += v_cnt
+                error_count += e_cnt
+                continue
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+            for line in lines:
+                if not line:
+                    continue
+                if validate_line(line):
+                    valid_stream.write(line + b'\n')
+                    valid_count += 1
+                else:
+                    error_stream.write(line + b'\n')
+                    error_count += 1
+
+        # 末尾に改行なしの最終行が残ることがある
+        if tail:
+            if validate_line(tail):
+                valid_stream.write(tail + b'\n')
+                valid_count += 1
+            else:
+                error_stream.write(tail + b'\n')
+                error_count += 1
+
+        # 残りのパートをflushしてマルチパートアップロードを完了する
+        print(f"Completing upload: s3://{dest_bucket}/{valid_key}")
+        valid_stream.close()
+        print(f"Completing upload: s3://{dest_bucket}/{error_key}")
+        error_stream.close()
+
+        total_count = valid_count + error_count
+        print(f"Completed. Total: {total_count}, Valid: {valid_count}, Error: {error_count}")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Success',
+                'source': f"s3://{bucket}/{key}",
+                'valid_output': f"s3://{dest_bucket}/{valid_key}",
+                'error_output': f"s3://{dest_bucket}/{error_key}",
+                'file_size_mb': round(file_size_mb, 2),
+                'total_lines': total_count,
+                'valid_lines': valid_count,
+                'error_lines': error_count,
+                'processing_mode': 'pure_python_streaming'
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        # 作成済みのマルチパートアップロードは破棄する
+        for stream in (valid_stream, error_stream):
+            if stream is not None:
+                try:
+                    stream.abort()
+                except Exception:
+                    pass
+        raise
@@ -0,0 +1,156 @@
+# クレンジング処理（DuckDB /tmpダウンロード版）
+import json
+import os
+import shutil
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+import duckdb
+
+# S3転送設定
+transfer_config = TransferConfig(
+    multipart_threshold=50 * 1024 * 1024,
+    max_concurrency=10,
+    multipart_chunksize=10 * 1024 * 1024,
+    num_download_attempts=5,
+    max_io_queue=1000,
+    io_chunksize=256 * 1024,
+    use_threads=True
+)
+
+s3_client = boto3.client('s3')
+
+# バリデーション条件（valid/errorの書き分けに使う）
+_VALID_EXPR = """
+                    -- noのバリデーション（nullでない、intであること）
+                    no IS NOT NULL
+                    AND TRIM(no) != ''
+                    AND TRY_CAST(no AS INTEGER) IS NOT NULL
+                    -- nameのバリデーション（20文字以内）。空フィールドは
+                    -- NULLで読まれ、LENGTH(NULL)<=20はNULLになって
+                    -- WHEREとWHERE NOTの両方から漏れるため、NULLは
+                    -- 明示的に許可する（Python版も空nameは有効扱い）
+                    AND (name IS NULL OR LENGTH(name) <= 20)
+                    -- created_dateのバリデーション（YYYY/MM/DD形式、有効な日付）。
+                    -- TRY_STRPTIMEは'2023/1/1'や'23/01/01'、前後の空白も
+                    -- 受理してしまうため、桁まで固定した形は正規表現で
+                    -- 先に確認し、暦上の妥当性だけをSTRPTIMEに任せる
+                    AND REGEXP_MATCHES(created_date, '^[0-9]{4}/[0-9]{2}/[0-9]{2}$')
+                    AND TRY_STRPTIME(created_date, '%Y/%m/%d') IS NOT NULL
+"""
+
+
+def lambda_handler(event, context):
+    """
+    大容量CSVファイルのクレンジング処理を行うLambda関数（DuckDB /tmpダウンロード版）
+    """
+    try:
+        # S3イベントから情報を取得
+        if 'Records' in event:
+            bucket = event['Records'][0]['s3']['bucket']['name']
+            key = event['Records'][0]['s3']['object']['key']
+        else:
+            bucket = event.get('bucket', os.environ.get('SOURCE_BUCKET'))
+            key = event.get('key')
+
+        dest_bucket = os.environ.get('DEST_BUCKET')
+
+        print(f"Processing file: s3://{bucket}/{key}")
+
+        # ファイルサイズを取得
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        file_size_mb = response['ContentLength'] / (1024 * 1024)
+        print(f"File size: {file_size_mb:.2f} MB")
+
+        # /tmpにダウンロード
+        local_input = '/tmp/input.csv'
+        local_valid = '/tmp/valid.csv'
+        local_error = '/tmp/error.csv'
+        print(f"Downloading to {local_input}...")
+        s3_client.download_file(bucket, key, local_input, Config=transfer_config)
+
+        # DuckDBで処理（メモリ制限設定）
+        conn = duckdb.connect(':memory:')
+
+        # メモリ制限（Lambda メモリの70%程度）
+        lambda_memory_mb = int(os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '10240'))
+        duckdb_memory_mb = int(lambda_memory_mb * 0.7)
+        conn.execute(f"SET memory_limit='{duckdb_memory_mb}MB'")
+
+        # 一時ディレクトリ設定
+        os.makedirs('/tmp/duckdb_temp', exist_ok=True)
+        conn.execute("SET temp_directory='/tmp/duckdb_temp'")
+
+        # スレッド数・順序保証なし（ストリーミング版と同じ設定）
+        conn.execute("SET threads=6")
+        conn.execute("SET preserve_insertion_order=false")
+
+        # 中間テーブルは作らず、スキャン→フィルタ→CSV書き出しを
+        # DuckDBのパイプラインに任せる（全行をVARCHARで
+        # メモリに持つとO(行数)のメモリを食うため）
+        print(f"Exporting valid data: {local_valid}")
+        conn.execute(f"""
+            COPY (
+                SELECT no, name, created_date
+                FROM read_csv('{local_input}',
+                    header=true,
+                    columns={{'no': 'VARCHAR', 'name': 'VARCHAR', 'created_date': 'VARCHAR'}},
+                    parallel=true,
+                    ignore_errors=false
+                )
+                WHERE {_VALID_EXPR}
+            ) TO '{local_valid}' (HEADER, DELIMITER ',', FORMAT CSV)
+        """)
+
+        print(f"Exporting error data: {local_error}")
+        conn.execute(f"""
+            COPY (
+                SELECT no, name, created_date
+                FROM read_csv('{local_input}',
+                    header=true,
+                    columns={{'no': 'VARCHAR', 'name': 'VARCHAR', 'created_date': 'VARCHAR'}},
+                    parallel=true,
+                    ignore_errors=false
+                )
+                WHERE NOT ({_VALID_EXPR})
+            ) TO '{local_error}' (HEADER, DELIMITER ',', FORMAT CSV)
+        """)
+
+        conn.close()
+
+        # S3にアップロード
+        valid_key = f"cleansed/{key}"
+        error_key = f"error/{key}"
+
+        print(f"Uploading valid data: s3://{dest_bucket}/{valid_key}")
+        s3_client.upload_file(local_valid, dest_bucket, valid_key, Config=transfer_config)
+
+        print(f"Uploading error data: s3://{dest_bucket}/{error_key}")
+        s3_client.upload_file(local_error, dest_bucket, error_key, Config=transfer_config)
+
+        # /tmpのクリーンアップ
+        for path in (local_input, local_valid, local_error):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists('/tmp/duckdb_temp'):
+            shutil.rmtree('/tmp/duckdb_temp')
+
+        print("Completed.")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Success',
+                'source': f"s3://{bucket}/{key}",
+                'valid_output': f"s3://{dest_bucket}/{valid_key}",
+                'error_output': f"s3://{dest_bucket}/{error_key}",
+                'file_size_mb': round(file_size_mb, 2),
+                'processing_mode': 'duckdb_local'
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
@@ -0,0 +1,149 @@
+# クレンジング処理（DuckDB S3直接読み込み・直接書き込み版）
+import json
+import os
+
+import boto3
+import duckdb
+
+s3_client = boto3.client('s3')
+
+# コールドスタート時に一度だけ接続を作り、設定とhttpfsのロードを
+# 済ませておく。ウォームスタートでは同じコンテナ上でそのまま
+# 使い回せるので、毎回数百msかかるロード・設定コストを払わない
+print("Configuring DuckDB...")
+_CONN = duckdb.connect(':memory:')
+
+# ホームディレクトリ設定（Lambda環境用）
+os.makedirs('/tmp/duckdb_home', exist_ok=True)
+_CONN.execute("SET home_directory='/tmp/duckdb_home'")
+
+# メモリ制限（Lambda メモリの70%程度）
+_lambda_memory_mb = int(os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '10240'))
+_CONN.execute(f"SET memory_limit='{int(_lambda_memory_mb * 0.7)}MB'")
+
+# 一時ディレクトリ設定
+os.makedirs('/tmp/duckdb_temp', exist_ok=True)
+_CONN.execute("SET temp_directory='/tmp/duckdb_temp'")
+
+# スレッド数（Lambda vCPU数）
+_CONN.execute(f"SET threads={os.cpu_count() or 6}")
+
+# 順序保証なしにし、並列性アップ
+_CONN.execute("SET preserve_insertion_order=false")
+
+# S3オブジェクトのメタデータを再利用する
+_CONN.execute("SET enable_object_cache=true")
+
+# httpfs拡張をインストール・ロード（S3直接アクセス用）
+print("Loading DuckDB httpfs extension...")
+_CONN.execute("INSTALL httpfs")
+_CONN.execute("LOAD httpfs")
+
+# S3認証はhttpfs同梱のAWS SDKのクレデンシャルチェーンに任せる。
+# Lambdaの実行ロールを環境変数経由で拾い、STSトークンの
+# ローテーションにも自動で追従するので、シークレットをSQLに
+# 文字列展開する必要がなくなる
+_CONN.execute("""
+    CREATE OR REPLACE SECRET s3_lambda (
+        TYPE S3,
+        PROVIDER CREDENTIAL_CHAIN,
+        CHAIN 'env;sts',
+        REGION 'ap-northeast-1'
+    )
+""")
+
+# バリデーション条件（valid/errorの書き分けに使う）
+_VALID_EXPR = """
+                    -- noのバリデーション（nullでない、intであること）
+                    no IS NOT NULL
+                    AND TRIM(no) != ''
+                    AND TRY_CAST(no AS INTEGER) IS NOT NULL
+                    -- nameのバリデーション（20文字以内）。空フィールドは
+                    -- NULLで読まれ、LENGTH(NULL)<=20のNULLはCASE WHENで
+                    -- error側に落ちてしまうため、NULLは明示的に許可する
+                    -- （Python版も空nameは有効扱い）
+                    AND (name IS NULL OR LENGTH(name) <= 20)
+                    -- created_dateのバリデーション（YYYY/MM/DD形式、有効な日付）。
+                    -- TRY_STRPTIMEは'2023/1/1'や'23/01/01'、前後の空白も
+                    -- 受理してしまうため、桁まで固定した形は正規表現で
+                    -- 先に確認し、暦上の妥当性だけをSTRPTIMEに任せる
+                    AND REGEXP_MATCHES(created_date, '^[0-9]{4}/[0-9]{2}/[0-9]{2}$')
+                    AND TRY_STRPTIME(created_date, '%Y/%m/%d') IS NOT NULL
+"""
+
+
+def lambda_handler(event, context):
+    """
+    大容量CSVファイルのクレンジング処理を行うLambda関数（DuckDB S3直接読み込み版）
+    """
+    try:
+        # S3イベントから情報を取得
+        if 'Records' in event:
+            bucket = event['Records'][0]['s3']['bucket']['name']
+            key = event['Records'][0]['s3']['object']['key']
+        else:
+            bucket = event.get('bucket', os.environ.get('SOURCE_BUCKET'))
+            key = event.get('key')
+
+        dest_bucket = os.environ.get('DEST_BUCKET')
+
+        print(f"Processing file: s3://{bucket}/{key}")
+
+        # ファイルサイズを取得
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        file_size_mb = response['ContentLength'] / (1024 * 1024)
+        print(f"File size: {file_size_mb:.2f} MB")
+
+        # ウォームスタートで使い回している接続を使う
+        # （S3認証はモジュールロード時のCREATE SECRETに任せる）
+        conn = _CONN
+
+        # S3パス構築
+        s3_path = f"s3://{bucket}/{key}"
+
+        print(f"Processing CSV directly from S3: {s3_path}")
+
+        # 出力先（result=cleansed / result=error のパーティションに分かれる）
+        out_prefix = f"s3://{dest_bucket}/output/{key}"
+
+        # 1回のスキャンで正常・エラー両方を書き分ける
+        # （valid用とerror用にCOPYを2回走らせるとS3からの
+        #   ダウンロードとCSVパースが二重になるため）
+        print(f"Exporting valid/error data directly to S3: {out_prefix}")
+        conn.execute(f"""
+            COPY (
+                SELECT no, name, created_date,
+                       CASE WHEN {_VALID_EXPR}
+                            THEN 'cleansed' ELSE 'error' END AS result
+                FROM read_csv('{s3_path}',
+                    header=true,
+                    columns={{'no': 'VARCHAR', 'name': 'VARCHAR', 'created_date': 'VARCHAR'}},
+                    parallel=true,
+                    ignore_errors=false
+                )
+            ) TO '{out_prefix}' (FORMAT CSV, HEADER, PARTITION_BY (result))
+        """)
+        print(f"Data uploaded: {out_prefix}")
+
+        # 接続は閉じずに次のウォームスタートへ持ち越す
+        # （/tmpのduckdb_home/duckdb_tempも使い回す）
+
+        print("Completed.")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Success',
+                'source': f"s3://{bucket}/{key}",
+                'valid_output': f"{out_prefix}/result=cleansed/",
+                'error_output': f"{out_prefix}/result=error/",
+                'file_size_mb': round(file_size_mb, 2),
+                'processing_mode': 'duckdb_s3_streaming'
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
@@ -0,0 +1,411 @@
+# スレッドプールバッチ並列版のクレンジングLambda
+import atexit
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
+
+import boto3
+
+from multipart_writer import MultipartS3Writer
+from specialized_validator import build_line_validator
+
+# NumPyがレイヤーにあればバッチ単位のベクトル化検証を使う
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numbaレイヤーがあればnogilのjitカーネルでバッチごと検証する
+try:
+    from validator import validate_rows
+except ImportError:
+    validate_rows = None
+
+s3_client = boto3.client('s3')
+
+# 進捗ログはCloudWatchへのprintがホットループに入るため、
+# 明示的に有効化したときだけ出す
+_VERBOSE = bool(os.environ.get('VERBOSE'))
+
+# アップロードの並行数（vCPUの2倍、上限10）
+UPLOAD_CONCURRENCY = min(10, (os.cpu_count() or 1) * 2)
+
+# バイトレンジGETのウィンドウサイズ（アップロードのパート境界に揃える）
+DOWNLOAD_PART_SIZE = 16 * 1024 * 1024
+# レンジGETの並行数
+DOWNLOAD_CONCURRENCY = min(10, (os.cpu_count() or 1) * 2)
+
+MAX_WORKERS = 4
+BATCH_SIZE = 1000
+
+# 1バッチの目標バイト数。小さすぎるとfutures投入のオーバーヘッドを
+# 払い、大きすぎるとパイプラインが詰まる。L2に収まる256KB程度を
+# 狙い、実際の行数は平均行長から逆算する
+TARGET_BATCH_BYTES = 256 * 1024
+
+# 月ごとの最大日数（2月は閏年分の29日で持ち、閏年判定は別途行う）
+_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+if np is not None:
+    _DAYS_ARR = np.array(_DAYS, dtype=np.int64)
+    # 日付10バイト中の数字であるべき位置（4,7は'/'）
+    _DATE_DIGIT_COLS = np.array([0, 1, 2, 3, 5, 6, 8, 9])
+
+def _make_executor():
+    """
+    ワーカープールを初期化する
+
+    nogilのjitカーネルがあれば検証中はGILが解放されるので、
+    pickleもプロセス起動も要らないスレッドプールでコア数ぶん
+    スケールする。無ければ純Python検証はGILを手放さないため
+    プロセスプールで並列度を確保するが、Lambdaには/dev/shmが無く
+    multiprocessingのSemLock生成が初回submitでOSErrorになるため、
+    ここで実際に1件投げて確かめてから採用する。失敗したら
+    スレッドプールに格下げする（GILで1コア相当になるが、全呼び出しが
+    失敗するよりよい）。
+    """
+    if validate_rows is not None:
+        return ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        executor.submit(int, 0).result()
+        return executor
+    except OSError:
+        print("ProcessPoolExecutor unavailable, falling back to threads")
+        return ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+
+# ワーカープールはs3_clientと同様にモジュールスコープで初期化し、
+# ウォームスタートの呼び出し間で再利用する（Lambdaは1コンテナ
+# 1同時実行なので再入の心配はない）。process_batchはモジュール
+# スコープ、バッチはbytes＋intリストなのでプロセスでもpickle可能
+_EXECUTOR = _make_executor()
+atexit.register(_EXECUTOR.shutdown)
+
+# 拡張なし環境のフォールバック用に、コールドスタート時に一度だけ
+# スキーマ特化版の行バリデーターをコード生成する（app.pyと共用）
+validate_csv_row = build_line_validator(
+    name_limit=int(os.environ.get('NAME_MAX_LENGTH', '20')))
+
+
+def _vector_validate(buf, starts, ends):
+    """
+    1バッチ分の行を行ループなしで一括検証し、boolマスクを返す
+
+    バッファをuint8配列としてビューし、カンマ数は==0x2Cのcumsum、
+    noの全数字判定は数字マスクのcumsum差分、日付は行末10バイトを
+    (N,10)にファンシーインデックスで切り出してのブール演算で
+    判定する。1行ごとのPythonバイトコード実行がNumPyのC実装
+    （ビルドによってはSIMD）のバッチ演算に置き換わる。
+    判定内容はvalidate_csv_rowと同一。
+    """
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    starts = np.asarray(starts, dtype=np.int64)
+    # 終端オフセットは改行込みなので、検証上の行末は1バイト手前
+    ends = np.asarray(ends, dtype=np.int64) - 1
+    # 最短の正常行は"1,,2020/01/01"の13バイト
+    valid = (ends - starts) >= 13
+
+    # 行ごとのカンマ数と数字数を累積カウントの差分で求める
+    comma_mask = arr == 0x2C
+    comma_cum = np.concatenate(([0], np.cumsum(comma_mask)))
+    first_comma = comma_cum[starts]
+    valid &= (comma_cum[ends] - first_comma) == 2
+
+    idx = np.flatnonzero(valid)
+    if len(idx) == 0:
+        return valid
+    s = starts[idx]
+    e = ends[idx]
+    comma_idx = np.flatnonzero(comma_mask)
+    c1 = comma_idx[first_comma[idx]]
+    c2 = comma_idx[first_comma[idx] + 1]
+
+    # no: 空でない整数であること（先頭の-は許可）
+    s_no = s + (arr[s] == 0x2D)
+    digit_cum = np.concatenate(
+        ([0], np.cumsum((arr >= 0x30) & (arr <= 0x39))))
+    ok = (c1 > s_no) & ((digit_cum[c1] - digit_cum[s_no]) == (c1 - s_no))
+
+    # name: 20バイト以内であること
+    ok &= (c2 - c1 - 1) <= 20
+
+    # created_date: 行末10バイトがYYYY/MM/DD形式かつ有効な日付であること
+    ok &= c2 == e - 11
+    d = arr[(e - 10)[:, None] + np.arange(10)]
+    ok &= (d[:, 4] == 0x2F) & (d[:, 7] == 0x2F)
+    dd = d[:, _DATE_DIGIT_COLS]
+    ok &= ((dd >= 0x30) & (dd <= 0x39)).all(axis=1)
+    di = d.astype(np.int64) - 0x30
+    y = di[:, 0] * 1000 + di[:, 1] * 100 + di[:, 2] * 10 + di[:, 3]
+    mo = di[:, 5] * 10 + di[:, 6]
+    da = di[:, 8] * 10 + di[:, 9]
+    mo_ok = (mo >= 1) & (mo <= 12)
+    ok &= mo_ok & (da >= 1)
+    ok &= da <= _DAYS_ARR[np.clip(mo, 1, 12) - 1]
+    # 2月29日は閏年のみ許可
+    leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+    ok &= ~((mo == 2) & (da == 29)) | leap
+
+    valid[idx] = ok
+    return valid
+
+
+def process_batch(task, _validate=validate_csv_row):
+    """
+    (buf, starts, ends)形式の1バッチを検証し、
+    (valid_blob, valid_count, error_blob, error_count)を返す
+
+    バッチは行リストではなく連続した1本のbytesバッファと行オフセットの
+    組で受け取る（pickleされるオブジェクトもバッファ1本＋intリスト
+    だけになる）。振り分け結果も行リストではなく連結済みのblob
+    1本ずつに畳んで返すため、メインスレッドはwriteと加算だけで済み、
+    スレッド間の受け渡しもbytes2本＋int2個になる。スキーマに
+    カンマ・引用符の埋め込みは無い前提なので、str専用のcsv.readerを
+    通さずbytesのままb','でフィールド分解する。
+    """
+    buf, starts, ends = task
+    valid_buf = bytearray()
+    error_buf = bytearray()
+    valid_count = 0
+    error_count = 0
+    if validate_rows is not None:
+        # jitカーネル: バッチ全体のループがnogilのネイティブコードで回る
+        # （終端オフセットは改行込みなので検証範囲は-1する）
+        arr = np.frombuffer(buf, dtype=np.uint8)
+        out = np.empty(len(starts), dtype=np.uint8)
+        validate_rows(arr, np.asarray(starts, dtype=np.int64),
+                      np.asarray(ends, dtype=np.int64) - 1, out)
+        flags = out.tolist()
+    elif np is not None:
+        # 検証本体はベクトル化し、行の振り分けだけをループで行う
+        flags = _vector_validate(buf, starts, ends).tolist()
+    else:
+        flags = [_validate(buf[s:e - 1]) for s, e in zip(starts, ends)]
+    for s, e, ok in zip(starts, ends, flags):
+        if ok:
+            valid_buf += buf[s:e]
+            valid_count += 1
+        else:
+            error_buf += buf[s:e]
+            error_count += 1
+    return bytes(valid_buf), valid_count, bytes(error_buf), error_count
+
+
+def _fetch_range(bucket, key, start, end):
+    """指定バイトレンジを1回のGETで取得する（end含む）"""
+    response = s3_client.get_object(
+        Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+    return response['Body'].read()
+
+
+def ranged_chunks(bucket, key, content_length,
+                  part_size=DOWNLOAD_PART_SIZE,
+                  concurrency=DOWNLOAD_CONCURRENCY):
+    """
+    オブジェクトを16MBのバイトレンジに分割し、並行GETで先読みしながら
+    順番にbytesチャンクとしてyieldする
+
+    単一のget_objectは1コネクションに直列化されるため、100MB級では
+    ネットワーク帯域を使い切れない。レンジごとのGETをスレッドプールに
+    並行数ぶん先行投入し、先頭から順に回収することでダウンロードを
+    N本並列にしつつ到着順は入力順のまま保つ。レンジ境界で切れた行は
+    呼び出し側のtail持ち越しで次チャンクに繋がるため、ここでは
+    行境界の整列は行わない。
+    """
+    ranges = [
+        (start, min(start + part_size, content_length) - 1)
+        for start in range(0, content_length, part_size)
+    ]
+    range_iter = iter(ranges)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque(
+            executor.submit(_fetch_range, bucket, key, a, b)
+            for a, b in islice(range_iter, concurrency))
+        while pending:
+            chunk = pending.popleft().result()
+            nxt = next(range_iter, None)
+            if nxt is not None:
+                pending.append(
+                    executor.submit(_fetch_range, bucket, key, *nxt))
+            yield chunk
+
+
+def iter_offset_batches(chunks, batch_size=BATCH_SIZE):
+    """
+    bytesチャンク列を(buf, starts, ends)形式のバッチ列に変換する
+
+    list(islice(...))で1000要素の行リストを作る代わりに、チャンクごとに
+    改行オフセットをbuf.findの1パスで求め、batch_size行ぶんの連続
+    スライスと相対オフセットの組をyieldする。行データはバッチ内で
+    1本の連続アロケーションのまま動かない。終端オフセットは改行を
+    含む位置なので、出力時はスライスをそのまま書けば行末の
+    b'\\n'連結は不要になる。チャンク末尾の欠けた行はtailとして
+    持ち越し、次チャンクの先頭と繋いでから走査する
+    （レンジGETの継ぎ目処理はここに集約される）。
+    """
+    tail = b''
+    for chunk in chunks:
+        buf = tail + chunk if tail else chunk
+        starts = []
+        ends = []
+        pos = 0
+        find = buf.find
+        while True:
+            nl = find(b'\n', pos)
+            if nl < 0:
+                break
+            if nl > pos:  # 空行は読み飛ばす
+                starts.append(pos)
+                ends.append(nl + 1)  # 改行込み
+            pos = nl + 1
+        tail = buf[pos:]
+        for i in range(0, len(starts), batch_size):
+            j = min(i + batch_size, len(starts))
+            base = starts[i]
+            yield (buf[base:ends[j - 1]],
+                   [s - base for s in starts[i:j]],
+                   [e - base for e in ends[i:j]])
+    if tail:
+        # 末尾に改行なしの最終行が残ることがあるので改行を補う
+        yield (tail + b'\n', [0], [len(tail) + 1])
+
+
+def lambda_handler(event, context):
+    """
+    大容量CSVファイルのクレンジング処理を行うLambda関数（スレッドプールバッチ並列版）
+    """
+    valid_stream = None
+    error_stream = None
+    try:
+        # S3イベントから情報を取得
+        if 'Records' in event:
+            bucket = event['Records'][0]['s3']['bucket']['name']
+            key = event['Records'][0]['s3']['object']['key']
+        else:
+            bucket = event.get('bucket', os.environ.get('SOURCE_BUCKET'))
+            key = event.get('key')
+
+        dest_bucket = os.environ.get('DEST_BUCKET')
+
+        print(f"Processing file: s3://{bucket}/{key}")
+
+        # ファイルサイズを取得
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        content_length = response['ContentLength']
+        file_size_mb = content_length / (1024 * 1024)
+        print(f"File size: {file_size_mb:.2f} MB")
+
+        valid_key = f"cleansed/{key}"
+        error_key = f"error/{key}"
+
+        # 出力は溜め込まず、検証と並行してマルチパートアップロードする
+        # （BytesIOに全量バッファするとピークメモリが入力サイズに比例する）
+        valid_stream = MultipartS3Writer(
+            s3_client, dest_bucket, valid_key, max_workers=UPLOAD_CONCURRENCY)
+        error_stream = MultipartS3Writer(
+            s3_client, dest_bucket, error_key, max_workers=UPLOAD_CONCURRENCY)
+
+        # ダウンロードは16MBレンジの並行GETで行う。検証はASCII範囲の
+        # バイトしか見ないため、デコードせずbytesのまま最後まで通す
+        chunks = ranged_chunks(bucket, key, content_length)
+
+        # 1行目はヘッダーとして切り出し、両方の出力に書く
+        head = b''
+        nl = -1
+        for chunk in chunks:
+            head += chunk
+            nl = head.find(b'\n')
+            if nl >= 0:
+                break
+        if nl >= 0:
+            valid_stream.write(head[:nl + 1])
+            error_stream.write(head[:nl + 1])
+            chunks = chain([head[nl + 1:]], chunks)
+
+        # 先頭64KBの改行数から平均行長を見積もり、1バッチが
+        # TARGET_BATCH_BYTES程度になる行数に調整する
+        # （固定1000行だと行幅次第でバッチの粒度が偏る）
+        sample = head[nl + 1:nl + 1 + 65536]
+        sample_rows = sample.count(b'\n')
+        mean_row_len = len(sample) // sample_rows if sample_rows else 64
+        batch_size = max(256, min(8192, TARGET_BATCH_BYTES // mean_row_len))
+        print(f"Batch size: {batch_size} rows (~{mean_row_len} B/row)")
+
+        valid_count = 0
+        error_count = 0
+        line_count = 0
+        batch_id = 0
+
+        # ワーカープールはモジュールスコープの_EXECUTORを再利用する
+        # （ウォームスタートではスレッド/プロセスの起動コストを払わない）。
+        # ワーカー数の2倍まで先行投入し、以後は完了1件ごとに
+        # 1件補充する。1件ごとにas_completedを作り直すと
+        # waiter集合の再構築がO(バッチ数^2)になるため、
+        # 先頭からresult()で待つFIFOパイプラインにする
+        # （投入順に回収するので出力順も入力順のまま保たれる）
+        batches = iter_offset_batches(chunks, batch_size=batch_size)
+        pending = deque(
+            _EXECUTOR.submit(process_batch, batch)
+            for batch in islice(batches, MAX_WORKERS * 2))
+        while pending:
+            future = pending.popleft()
+            valid_blob, v_cnt, error_blob, e_cnt = future.result()
+            batch = next(batches, None)
+            if batch is not None:
+                pending.append(_EXECUTOR.submit(process_batch, batch))
+            # 出力ストリームに書くのはこのメインスレッドだけ
+            # （ワーカーはタプルを返すのみ）なのでロックは不要。
+            # 振り分け済みのblobをそのまま書くだけで、行単位の
+            # ループはメインスレッドに存在しない
+            if valid_blob:
+                valid_stream.write(valid_blob)
+            if error_blob:
+                error_stream.write(error_blob)
+            valid_count += v_cnt
+            error_count += e_cnt
+            line_count += v_cnt + e_cnt
+            # 進捗は64バッチに1回、VERBOSE指定時のみ出す
+            # （formatとprintのsyscallをホットループから外す）
+            if _VERBOSE and batch_id & 63 == 0:
+                print(f"Processed {line_count} lines...")
+            batch_id += 1
+
+        # 残りのパートをflushしてマルチパートアップロードを完了する
+        print(f"Completing upload: s3://{dest_bucket}/{valid_key}")
+        valid_stream.close()
+        print(f"Completing upload: s3://{dest_bucket}/{error_key}")
+        error_stream.close()
+
+        total_count = valid_count + error_count
+        print(f"Completed. Total: {total_count}, Valid: {valid_count}, Error: {error_count}")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Success',
+                'source': f"s3://{bucket}/{key}",
+                'valid_output': f"s3://{dest_bucket}/{valid_key}",
+                'error_output': f"s3://{dest_bucket}/{error_key}",
+                'file_size_mb': round(file_size_mb, 2),
+                'total_lines': total_count,
+                'valid_lines': valid_count,
+                'error_lines': error_count,
+                'processing_mode': 'thread_pool_batch'
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        # 作成済みのマルチパートアップロードは破棄する
+        for stream in (valid_stream, error_stream):
+            if stream is not None:
+                try:
+                    stream.abort()
+                except Exception:
+                    pass
+        raise
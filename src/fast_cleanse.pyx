@@ -0,0 +1,106 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# 8MBチャンクを1パスでクレンジングするCython拡張
+#
+# Pythonの行ループを介さず、memchrで改行を探しながら
+# valid/errorの2つの出力バッファへ直接振り分ける。
+# ビルド: python setup_fast_cleanse.py build_ext --inplace
+from libc.string cimport memchr
+
+cdef int _DAYS[12]
+_DAYS[0] = 31; _DAYS[1] = 29; _DAYS[2] = 31; _DAYS[3] = 30
+_DAYS[4] = 31; _DAYS[5] = 30; _DAYS[6] = 31; _DAYS[7] = 31
+_DAYS[8] = 30; _DAYS[9] = 31; _DAYS[10] = 30; _DAYS[11] = 31
+
+
+cdef inline bint _validate(const unsigned char* p, Py_ssize_t n) nogil:
+    """no(int),name(<=20),created_date(YYYY/MM/DD) の1行を検証する"""
+    cdef Py_ssize_t c1 = -1
+    cdef Py_ssize_t c2 = -1
+    cdef Py_ssize_t i
+    cdef Py_ssize_t start = 0
+    cdef const unsigned char* d
+    cdef int y, mo, da
+
+    # カンマ2つの位置を探す（3つ目があれば列数超過で無効）
+    for i in range(n):
+        if p[i] == 0x2C:
+            if c1 < 0:
+                c1 = i
+            elif c2 < 0:
+                c2 = i
+            else:
+                return 0
+    if c1 <= 0 or c2 < 0:
+        return 0
+
+    # no: 空でない整数（先頭の-は許可）
+    if p[0] == 0x2D and c1 > 1:
+        start = 1
+    for i in range(start, c1):
+        if p[i] < 0x30 or p[i] > 0x39:
+            return 0
+
+    # name: 20バイト以内
+    if c2 - c1 - 1 > 20:
+        return 0
+
+    # created_date: ちょうど10バイトで4・7桁目が'/'、残りは数字
+    if n - c2 - 1 != 10:
+        return 0
+    d = p + c2 + 1
+    if d[4] != 0x2F or d[7] != 0x2F:
+        return 0
+    for i in range(10):
+        if i == 4 or i == 7:
+            continue
+        if d[i] < 0x30 or d[i] > 0x39:
+            return 0
+
+    y = (d[0] - 0x30) * 1000 + (d[1] - 0x30) * 100 \
+        + (d[2] - 0x30) * 10 + (d[3] - 0x30)
+    mo = (d[5] - 0x30) * 10 + (d[6] - 0x30)
+    da = (d[8] - 0x30) * 10 + (d[9] - 0x30)
+
+    if mo < 1 or mo > 12 or da < 1 or da > _DAYS[mo - 1]:
+        return 0
+    if mo == 2 and da == 29 and not (y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)):
+        return 0
+    return 1
+
+
+def cleanse_chunk(bytes chunk, bytes tail):
+    """
+    tail+chunkを行単位に分割して検証し、
+    (valid, error, new_tail, valid_count, error_count) を返す
+
+    行の切り出し（memchr）・検証・出力バッファへの振り分けまで
+    1パスで行う。末尾の改行で終わらない部分はnew_tailとして返すので
+    次のチャンクの先頭に連結すること。
+    """
+    cdef bytes data = tail + chunk
+    cdef const unsigned char* base = data
+    cdef Py_ssize_t n = len(data)
+    cdef bytearray valid_buf = bytearray()
+    cdef bytearray error_buf = bytearray()
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t line_len
+    cdef Py_ssize_t valid_count = 0
+    cdef Py_ssize_t error_count = 0
+    cdef const unsigned char* nl
+
+    while pos < n:
+        nl = <const unsigned char*> memchr(base + pos, 0x0A, n - pos)
+        if nl == NULL:
+            break
+        line_len = nl - (base + pos)
+        if line_len > 0:
+            # 改行込みのスライスをそのまま出力バッファへ積む
+            if _validate(base + pos, line_len):
+                valid_buf += data[pos:pos + line_len + 1]
+                valid_count += 1
+            else:
+                error_buf += data[pos:pos + line_len + 1]
+                error_count += 1
+        pos += line_len + 1
+
+    return bytes(valid_buf), bytes(error_buf), data[pos:], valid_count, error_count
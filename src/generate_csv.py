@@ -0,0 +1,144 @@
+# 検証用CSVデータ生成スクリプト
+#
+# no(int),name(str<=20),created_date(YYYY/MM/DD) のテストデータを
+# チャンク単位で生成してCSVに追記していく。
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHUNK_SIZE = 1_000_000
+
+# nameに使う文字（英数字62種）のASCIIバイトLUT
+_NAME_CHARS = np.frombuffer(
+    b'abcdefghijklmnopqrstuvwxyz'
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    b'0123456789', dtype=np.uint8)
+
+_DATE_START = np.datetime64('2020-01-01')
+_DATE_RANGE_DAYS = int(
+    (np.datetime64('2025-12-31') - _DATE_START) / np.timedelta64(1, 'D'))
+
+# 2020-01-01から各年初(2020..2026)までの累積日数（2020/2024が閏年）
+_CUM_YEAR_DAYS = np.array(
+    [0, 366, 731, 1096, 1461, 1827, 2192], dtype=np.int64)
+
+# 各月初までの累積日数（平年/閏年）
+_CUM_MONTH_DAYS = np.array(
+    [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334], dtype=np.int64)
+_CUM_MONTH_DAYS_LEAP = np.array(
+    [0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335], dtype=np.int64)
+
+
+def generate_random_names_batch(rng, count, min_length=5, max_length=20):
+    """
+    ランダムな英数字名をNumPyのバイト列操作で一括生成する
+
+    (count, max_length)のuint8配列をLUT引きで埋め、行ごとの長さを
+    超える末尾を\\x00で潰してS型ビューで切り出す（固定幅S型は
+    末尾の\\x00を落としてくれる）。Pythonレベルの行ループや
+    ''.joinは発生しない。
+    """
+    arr = _NAME_CHARS[rng.integers(
+        0, len(_NAME_CHARS), size=(count, max_length), dtype=np.uint8)]
+    lengths = rng.integers(min_length, max_length + 1, count)
+    arr[np.arange(max_length)[None, :] >= lengths[:, None]] = 0
+    return arr.view(f'S{max_length}').ravel()
+
+
+def generate_random_dates_batch(rng, count):
+    """
+    ランダムな日付(YYYY/MM/DD)を整数演算と累積日数LUTで一括生成する
+
+    datetime_as_stringでも要素ごとにC側のフォーマッタが走るため、
+    2020-01-01からの通算日数を年初・月初の累積日数テーブルで
+    年/月/日に分解し、divmodの桁取り出しで(count,10)のuint8
+    バッファへ直接スタンプする。チャンク全体が十数個のnumpy演算に
+    収まり、要素単位の処理は残らない。
+    """
+    days = rng.integers(0, _DATE_RANGE_DAYS + 1, count)
+    year_idx = np.searchsorted(_CUM_YEAR_DAYS, days, side='right') - 1
+    day_of_year = days - _CUM_YEAR_DAYS[year_idx]
+    years = 2020 + year_idx
+
+    # 2020..2025の範囲なので閏年判定は4年ルールだけでよい
+    cum = np.where((years % 4 == 0)[:, None],
+                   _CUM_MONTH_DAYS_LEAP[None, :], _CUM_MONTH_DAYS[None, :])
+    months = (day_of_year[:, None] >= cum).sum(axis=1)  # 1..12
+    month_start = np.take_along_axis(
+        cum, (months - 1)[:, None], axis=1)[:, 0]
+    day_in_month = day_of_year - month_start + 1
+
+    buf = np.empty((count, 10), dtype=np.uint8)
+    q, r = np.divmod(years, 10)
+    buf[:, 3] = 0x30 + r
+    q, r = np.divmod(q, 10)
+    buf[:, 2] = 0x30 + r
+    q, r = np.divmod(q, 10)
+    buf[:, 1] = 0x30 + r
+    buf[:, 0] = 0x30 + q % 10
+    buf[:, 4] = 0x2F  # '/'
+    q, r = np.divmod(months, 10)
+    buf[:, 5] = 0x30 + q
+    buf[:, 6] = 0x30 + r
+    buf[:, 7] = 0x2F  # '/'
+    q, r = np.divmod(day_in_month, 10)
+    buf[:, 8] = 0x30 + q
+    buf[:, 9] = 0x30 + r
+    return buf.view('S10').ravel()
+
+
+def build_chunk_bytes(start, count, seed, error_rate=0.0):
+    """
+    1チャンク分のCSV行をbytesとして構築する
+
+    no/nameは可変長なので固定オフセットには置けない。代わりに
+    S型配列のまま列をnp.char.addで連結し、tolist()（末尾\\x00は
+    落ちる）をb'\\n'.joinで1回のCループに畳む。pandasの
+    行ごとのフォーマット処理は通らない。
+    """
+    # ワーカーごとに別ストリームのシードを渡して乱数列の重複を避ける
+    rng = np.random.default_rng(seed)
+    nos = np.char.mod('%d', np.arange(start + 1, start + count + 1)).astype('S12')
+    names = generate_random_names_batch(rng, count)
+    dates = generate_random_dates_batch(rng, count)
+    if error_rate > 0:
+        # 一部の行を不正な日付に差し替えてクレンジング対象を作る
+        dates[rng.random(count) < error_rate] = b'9999/99/99'
+    rows = np.char.add(np.char.add(
+        np.char.add(np.char.add(nos, b','), names), b','), dates)
+    return b'\n'.join(rows.tolist()) + b'\n'
+
+
+def _build_chunk_task(args):
+    return build_chunk_bytes(*args)
+
+
+def generate_csv(path, total_rows, chunk_size=CHUNK_SIZE, error_rate=0.0,
+                 seed=0):
+    """
+    チャンク単位でテストデータを生成してCSVに書き出す
+
+    各チャンクは独立な乱数データなのでProcessPoolExecutorで
+    全コア並列に生成し、親プロセスはexecutor.mapの順序保証に
+    乗って到着順に書き出すだけにする。
+    """
+    tasks = [
+        (start, min(chunk_size, total_rows - start), seed + i, error_rate)
+        for i, start in enumerate(range(0, total_rows, chunk_size))
+    ]
+    done = 0
+    with open(path, 'wb') as f, \
+            ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        f.write(b'no,name,created_date\n')
+        for task, blob in zip(tasks, executor.map(_build_chunk_task, tasks)):
+            f.write(blob)
+            done += task[1]
+            print(f"Generated {done:,} / {total_rows:,} rows")
+
+
+if __name__ == '__main__':
+    output_path = sys.argv[1] if len(sys.argv) > 1 else 'test_data.csv'
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000
+    generate_csv(output_path, rows)
@@ -0,0 +1,97 @@
+# S3マルチパートアップロードへ逐次書き込むライター（app.py/app_threaded.py共用）
+from concurrent.futures import ThreadPoolExecutor
+
+# マルチパートアップロードのパートサイズ。S3は8〜16MBの
+# パート境界に揃えると後段のバイトレンジGETがパート単位で
+# 当たりやすく、PUTリクエスト数も減る
+PART_SIZE = 16 * 1024 * 1024
+
+
+class MultipartS3Writer:
+    """
+    処理と並行してS3へ逐次アップロードするライター
+
+    write()でbytesを溜め、パートサイズに達したらスレッドプールに
+    upload_partを投げて即座に処理へ戻る。close()で残りをflushして
+    complete_multipart_uploadする。バッファはパートサイズ固定で
+    確保して書き込みカーソルだけ進めるため、bytearrayの伸長に伴う
+    倍々の再確保とmemcpyは発生しない。メモリ使用量はファイル
+    サイズによらずO(パートサイズ×並行数)に収まる。
+    """
+
+    def __init__(self, client, bucket, key, part_size=PART_SIZE, max_workers=10):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._part_size = part_size
+        self._buf = bytearray(part_size)  # 固定長で事前確保
+        self._pos = 0
+        self._max_inflight = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+        self._part_number = 0
+        self._upload_id = client.create_multipart_upload(
+            Bucket=bucket, Key=key)['UploadId']
+
+    def write(self, data):
+        # パート境界をまたぐ書き込みはビューのまま分割して詰める
+        view = memoryview(data)
+        offset = 0
+        remaining = len(view)
+        while remaining > 0:
+            take = min(remaining, self._part_size - self._pos)
+            self._buf[self._pos:self._pos + take] = view[offset:offset + take]
+            self._pos += take
+            offset += take
+            remaining -= take
+            if self._pos == self._part_size:
+                self._submit_part()
+
+    def _submit_part(self):
+        if self._pos == 0:
+            return
+        # バックプレッシャー: 未完了パートが並行数に達していたら
+        # 最古の完了を待つ。Executorの無制限キューに積み続けると、
+        # 検証がPUTより速いときに待機パートがO(ファイルサイズ)で
+        # 滞留し、O(パートサイズ×並行数)のメモリ上限が崩れる
+        inflight = [f for f in self._futures if not f.done()]
+        if len(inflight) >= self._max_inflight:
+            inflight[0].result()
+        self._part_number += 1
+        # アップロード用のコピーを取ればバッファはすぐ再利用できる
+        part = bytes(memoryview(self._buf)[:self._pos])
+        self._pos = 0
+        self._futures.append(
+            self._executor.submit(self._upload_part, part, self._part_number))
+
+    def _upload_part(self, data, part_number):
+        response = self._client.upload_part(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=data)
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+    def close(self):
+        if self._part_number == 0 and self._pos == 0:
+            # 1バイトも書かれていない場合、パート0件の
+            # complete_multipart_uploadはS3に拒否されるため、
+            # マルチパートは破棄して空オブジェクトをPUTする
+            self._executor.shutdown()
+            self._client.abort_multipart_upload(
+                Bucket=self._bucket, Key=self._key, UploadId=self._upload_id)
+            self._client.put_object(
+                Bucket=self._bucket, Key=self._key, Body=b'')
+            return
+        self._submit_part()
+        try:
+            parts = [f.result() for f in self._futures]
+        finally:
+            self._executor.shutdown()
+        parts.sort(key=lambda p: p['PartNumber'])
+        self._client.complete_multipart_upload(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id,
+            MultipartUpload={'Parts': parts})
+
+    def abort(self):
+        self._executor.shutdown(wait=False)
+        self._client.abort_multipart_upload(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id)
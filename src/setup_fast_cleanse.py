@@ -0,0 +1,11 @@
+# fast_cleanse.pyxのビルドスクリプト
+#
+# Lambdaレイヤー作成時にmanylinux環境で以下を実行する:
+#   python setup_fast_cleanse.py build_ext --inplace
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name='fast_cleanse',
+    ext_modules=cythonize('fast_cleanse.pyx'),
+)
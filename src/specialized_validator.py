@@ -0,0 +1,68 @@
+# スキーマ特化の行バリデーターをコード生成する（app.py/app_threaded.py共用）
+#
+# スキーマ（no:int, name:VARCHAR(20), created_date:YYYY/MM/DD）は
+# 静的なので、列数やname長をソースに定数として埋め込み、
+# exec(compile(...))で1関数に部分評価した直列コードを生成する。
+# 汎用のcsv.reader経路は通らない。
+
+# 数字以外の全バイト（translateの削除テーブルとして全数字判定に使う）
+_NON_DIGIT = bytes(i for i in range(256) if not (0x30 <= i <= 0x39))
+
+# 月ごとの最大日数（2月は閏年分の29日で持ち、閏年判定は別途行う）
+_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+# バリデーターのソーステンプレート。スキーマ由来の定数
+# （name長など）を埋め込んでからexecで特化版を生成する
+_VALIDATOR_TEMPLATE = '''
+def validate_csv_row(line, _non_digit=_NON_DIGIT, _days=_DAYS):
+    parts = line.split(b",")
+    if len(parts) != {column_count}:
+        return False
+    no, name, created_date = parts
+
+    # no: 空でない整数であること（translateで全数字判定、先頭の-は許可）
+    if no and no[0] == 0x2D:
+        no = no[1:]
+    if not no or no.translate(None, _non_digit) != no:
+        return False
+
+    # name: {name_limit}バイト以内であること（bytesのまま通すため
+    # バイト長判定。このスキーマは英数字のみ）
+    if len(name) > {name_limit}:
+        return False
+
+    # created_date: YYYY/MM/DD形式かつ有効な日付であること。
+    # 月日数テーブル＋閏年判定はdatetime.date(y, m, d)の
+    # コンストラクタ検証と同値
+    if len(created_date) != 10:
+        return False
+    if created_date[4] != 0x2F or created_date[7] != 0x2F:
+        return False
+    digits = created_date[:4] + created_date[5:7] + created_date[8:]
+    if digits.translate(None, _non_digit) != digits:
+        return False
+    y, mo, da = int(created_date[:4]), int(created_date[5:7]), int(created_date[8:])
+    if mo < 1 or mo > 12 or da < 1 or da > _days[mo - 1]:
+        return False
+    # 2月29日は閏年のみ許可
+    if mo == 2 and da == 29 and not (y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)):
+        return False
+    return True
+'''
+
+
+def build_line_validator(column_count=3, name_limit=20):
+    """
+    スキーマ特化の行バリデーター（拡張なし環境用フォールバック）を生成する
+
+    列数・name長をソースに定数として埋め込み、exec(compile(...))で
+    1関数に特化させる。参照テーブルはデフォルト引数でローカルに
+    束縛されるため、ホットループはLOAD_CONST/LOAD_FAST中心の
+    直列コードになる。スキーマを環境変数化しても再生成だけで済む。
+    """
+    source = _VALIDATOR_TEMPLATE.format(
+        column_count=column_count, name_limit=name_limit)
+    namespace = {'_NON_DIGIT': _NON_DIGIT, '_DAYS': _DAYS}
+    exec(compile(source, '<validator-codegen>', 'exec'), namespace)
+    return namespace['validate_csv_row']
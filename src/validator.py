@@ -0,0 +1,120 @@
+# Numbaでjitコンパイルするバイト列ベースの行バリデーター
+#
+# app.pyのホットループから1行=bytesのまま渡す前提。文字列を
+# jit関数に持ち込むとobject modeに落ちるので、引数はbytesのみ。
+import numpy as np
+from numba import njit
+
+_COMMA = 0x2C
+_SLASH = 0x2F
+_ZERO = 0x30
+_NINE = 0x39
+
+# SWAR用の定数（'YYYY/MM/'の8バイトをu64 1本として一括判定する）
+_SLASH_LANES = np.uint64((0xFF << 32) | (0xFF << 56))
+_ZERO_LANES = np.uint64((0x30 << 32) | (0x30 << 56))
+_ALL_0x30 = np.uint64(0x3030303030303030)
+_ALL_0x39 = np.uint64(0x3939393939393939)
+_ALL_0x80 = np.uint64(0x8080808080808080)
+
+# 月ごとの最大日数（2月は29日で持ち、閏年判定は別途行う）
+_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+@njit(nogil=True, cache=True)
+def _validate_range(buf, s, n):
+    """buf[s:n]の1行を検証する本体（bytesとuint8配列の両方を受ける）"""
+    # カンマ2つの位置を探す（3つ目があれば列数超過で無効）
+    c1 = -1
+    c2 = -1
+    for i in range(s, n):
+        if buf[i] == _COMMA:
+            if c1 < 0:
+                c1 = i
+            elif c2 < 0:
+                c2 = i
+            else:
+                return 0
+    if c1 < 0 or c2 < 0:
+        return 0
+
+    # no: 空でない整数（先頭の-は許可）
+    if c1 == s:
+        return 0
+    start = s + 1 if buf[s] == 0x2D and c1 > s + 1 else s
+    for i in range(start, c1):
+        if buf[i] < _ZERO or buf[i] > _NINE:
+            return 0
+
+    # name: 20バイト以内
+    if c2 - c1 - 1 > 20:
+        return 0
+
+    # created_date: ちょうど10バイトで4・7桁目が'/'、残りは数字
+    d = c2 + 1
+    if n - d != 10:
+        return 0
+
+    # SWAR: 'YYYY/MM/'の8バイトをリトルエンディアンでu64に詰める
+    # （連続ロード+シフトはLLVMが単一の8バイトロードに潰してくれる）
+    v = np.uint64(0)
+    for k in range(8):
+        v |= np.uint64(buf[d + k]) << np.uint64(8 * k)
+
+    # '/'レーン（4・7バイト目）を検証してから'0'に差し替え、
+    # 8レーンすべてを数字として一括レンジチェックする
+    if (v >> np.uint64(32)) & np.uint64(0xFF) != np.uint64(_SLASH):
+        return 0
+    if (v >> np.uint64(56)) & np.uint64(0xFF) != np.uint64(_SLASH):
+        return 0
+    w = (v & ~_SLASH_LANES) | _ZERO_LANES
+    if ((w - _ALL_0x30) | (_ALL_0x39 - w)) & _ALL_0x80 != np.uint64(0):
+        return 0
+
+    # 'DD'の2バイトは素直に比較する
+    if buf[d + 8] < _ZERO or buf[d + 8] > _NINE:
+        return 0
+    if buf[d + 9] < _ZERO or buf[d + 9] > _NINE:
+        return 0
+
+    y = ((buf[d] - _ZERO) * 10 + (buf[d + 1] - _ZERO)) * 100 \
+        + (buf[d + 2] - _ZERO) * 10 + (buf[d + 3] - _ZERO)
+    mo = (buf[d + 5] - _ZERO) * 10 + (buf[d + 6] - _ZERO)
+    da = (buf[d + 8] - _ZERO) * 10 + (buf[d + 9] - _ZERO)
+
+    if mo < 1 or mo > 12 or da < 1 or da > _DAYS[mo - 1]:
+        return 0
+    if mo == 2 and da == 29 and not (y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)):
+        return 0
+    return 1
+
+
+@njit(nogil=True, cache=True)
+def validate_bytes(buf):
+    """
+    no(int),name(<=20),created_date(YYYY/MM/DD) の1行をバイトレベルで
+    検証する。有効なら1、無効なら0を返す。
+    """
+    return _validate_range(buf, 0, len(buf))
+
+
+@njit(nogil=True, cache=True)
+def validate_rows(arr, starts, ends, out):
+    """
+    uint8バッファ上の複数行をオフセット配列で一括検証し、outに書き込む
+
+    ループ全体がjitコード内で回り、nogil=Trueなので実行中はGILを
+    解放する。複数スレッドから呼べばプロセスを立てずにコア数ぶん
+    スケールする。
+    """
+    for i in range(len(starts)):
+        out[i] = _validate_range(arr, starts[i], ends[i])
+
+
+# コールドスタート時に一度だけコンパイルを済ませておく
+# （cache=Trueなので2回目以降のコンテナではキャッシュが効く）
+validate_bytes(b"1,a,2024/01/01")
+_WARMUP = np.frombuffer(b"1,a,2024/01/01", dtype=np.uint8)
+validate_rows(_WARMUP, np.zeros(1, dtype=np.int64),
+              np.array([len(_WARMUP)], dtype=np.int64),
+              np.zeros(1, dtype=np.uint8))